@@ -0,0 +1,245 @@
+import os
+import json
+import shutil
+import hashlib
+import time
+import uuid
+import tempfile
+import zipfile
+from typing import Iterable, List, Optional, Tuple
+
+# ---------------- PATHS ----------------
+STORE_DIR = os.path.join("data", "store")
+DEFAULT_MAX_BYTES = int(os.environ.get("ARTIFACT_STORE_MAX_BYTES", 512 * 1024 * 1024))
+
+RESULT_FILE = "issues.json"
+# Entries touched more recently than this are never evicted - they may belong to another session's in-flight review
+GC_MIN_AGE_SECONDS = 15 * 60
+
+
+# ---------------- HASHING ----------------
+def hash_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def hash_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write to a temp file in the same dir, then rename, so readers never see partial files."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _publish(src: str, dst: str) -> bool:
+    """
+    Make src visible at dst only if dst doesn't exist yet (first writer wins), atomically.
+    Concurrent sessions producing the same entry therefore never overwrite or delete each other's files.
+    Returns True if src was published.
+    """
+    try:
+        os.link(src, dst)
+        return True
+    except FileExistsError:
+        return False
+    except OSError:
+        # Filesystem without hardlinks
+        if os.path.exists(dst):
+            return False
+        shutil.copy(src, dst)
+        return True
+
+def _touch(path: str):
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+def _entry_size(path: str, seen: set) -> int:
+    """Bytes used by a file or dir. Hardlinked files (unchanged reviewed outputs) are counted once via `seen`."""
+    paths = [path] if os.path.isfile(path) else [
+        os.path.join(root, fname) for root, _, files in os.walk(path) for fname in files
+    ]
+    total = 0
+    for p in paths:
+        st = os.stat(p)
+        if (st.st_dev, st.st_ino) not in seen:
+            seen.add((st.st_dev, st.st_ino))
+            total += st.st_size
+    return total
+
+
+# ---------------- STORE ----------------
+class ArtifactStore:
+    """
+    Content-addressed storage for uploads, review results and ZIP bundles.
+    - uploads/<sha256><ext>                         : identical uploads are stored once, whatever their name
+    - results/<sha256>-<version>-<name hash>/       : cached issues + reviewed output per (file hash, pipeline version,
+                                                      filename) - the filename goes into the prompt and the output name
+    - bundles/<sha256 of names + file hashes>.zip   : ZIP built once per set of reviewed files
+    - scratch/<uuid>/                               : per-review working files, published into results/ once complete
+    Files in uploads/ and results/ are only ever created (first writer wins), never rewritten, so sessions
+    reviewing the same file concurrently can't clobber each other.
+    Entries are evicted least-recently-used first once the store exceeds max_bytes.
+    """
+
+    def __init__(self, root: str = STORE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.uploads_dir = os.path.join(root, "uploads")
+        self.results_dir = os.path.join(root, "results")
+        self.bundles_dir = os.path.join(root, "bundles")
+        self.scratch_dir = os.path.join(root, "scratch")
+        for d in (self.uploads_dir, self.results_dir, self.bundles_dir, self.scratch_dir):
+            os.makedirs(d, exist_ok=True)
+
+    # ---- Uploads ----
+    def put_upload(self, data: bytes, filename: str) -> Tuple[str, str]:
+        """
+        Store an upload by content hash. Returns (digest, path); identical content is not rewritten.
+        The blob keeps only the extension - callers keep the original filename themselves.
+        """
+        digest = hash_bytes(data)
+        ext = os.path.splitext(filename)[1].lower()
+        path = os.path.join(self.uploads_dir, f"{digest}{ext}")
+        if os.path.exists(path):
+            _touch(path)
+        else:
+            _atomic_write(path, data)
+        return digest, path
+
+    # ---- Review results ----
+    def _result_dir(self, digest: str, version: str, filename: str) -> str:
+        name_key = hash_bytes(os.path.basename(filename).encode("utf-8"))[:16]
+        return os.path.join(self.results_dir, f"{digest}-{version}-{name_key}")
+
+    def get_result(self, digest: str, version: str, filename: str) -> Optional[List[dict]]:
+        path = os.path.join(self._result_dir(digest, version, filename), RESULT_FILE)
+        if not os.path.exists(path):
+            return None
+        _touch(os.path.dirname(path))
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put_result(self, digest: str, version: str, filename: str, issues: List[dict]):
+        """Cache the issues for one document. If another session cached them first, theirs are kept."""
+        entry = self._result_dir(digest, version, filename)
+        os.makedirs(entry, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=entry, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(issues).encode("utf-8"))
+            _publish(tmp, os.path.join(entry, RESULT_FILE))
+        finally:
+            os.remove(tmp)
+
+    # ---- Reviewed outputs ----
+    def scratch_path(self, filename: str) -> str:
+        """Fresh private path to write a reviewed output to, before save_reviewed publishes it."""
+        entry = os.path.join(self.scratch_dir, uuid.uuid4().hex)
+        os.makedirs(entry)
+        return os.path.join(entry, f"reviewed_{os.path.basename(filename)}")
+
+    def save_reviewed(self, digest: str, version: str, filename: str, path: str) -> str:
+        """
+        Publish a reviewed output written at scratch `path` into the result entry, if the result is cached.
+        Returns the path to use: the cached file (possibly another session's identical output), or `path`
+        itself when the result was incomplete and must not be cached.
+        """
+        entry = self._result_dir(digest, version, filename)
+        if not os.path.exists(os.path.join(entry, RESULT_FILE)):
+            return path
+        final = os.path.join(entry, f"reviewed_{os.path.basename(filename)}")
+        _publish(path, final)
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+        return final
+
+    def get_reviewed(self, digest: str, version: str, filename: str) -> Optional[str]:
+        """Return the cached reviewed file, only if it belongs to a cached (complete) result."""
+        entry = self._result_dir(digest, version, filename)
+        path = os.path.join(entry, f"reviewed_{os.path.basename(filename)}")
+        if os.path.exists(path) and os.path.exists(os.path.join(entry, RESULT_FILE)):
+            _touch(entry)
+            return path
+        return None
+
+    @staticmethod
+    def link(src: str, dst: str):
+        """Hardlink an unchanged file to a scratch path, falling back to a copy across filesystems."""
+        if os.path.exists(dst):
+            os.remove(dst)
+        try:
+            os.link(src, dst)
+        except OSError:
+            shutil.copy(src, dst)
+
+    # ---- ZIP bundles ----
+    def bundle(self, filepaths: Iterable[str]) -> str:
+        """Build the ZIP for a set of reviewed files once; later calls return the file on disk.
+        Keyed on each file's name and content, so a rewritten reviewed file gets a new bundle."""
+        filepaths = list(dict.fromkeys(filepaths))
+        entries = sorted(f"{os.path.basename(p)}:{hash_file(p)}" for p in filepaths)
+        key = hash_bytes("\n".join(entries).encode("utf-8"))
+        path = os.path.join(self.bundles_dir, f"{key}.zip")
+        if os.path.exists(path):
+            _touch(path)
+            return path
+
+        fd, tmp = tempfile.mkstemp(dir=self.bundles_dir, prefix=".tmp-")
+        os.close(fd)
+        try:
+            with zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as zipf:
+                for filepath in filepaths:
+                    zipf.write(filepath, arcname=os.path.basename(filepath))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    # ---- Garbage collection ----
+    def gc(self, keep: Iterable[str] = ()) -> int:
+        """
+        Evict least-recently-used entries until the store fits in max_bytes.
+        Paths in `keep` (and anything under them) are never evicted, nor is anything touched in the last
+        GC_MIN_AGE_SECONDS, which covers other sessions' in-flight reviews. Returns bytes freed.
+        """
+        keep = [os.path.abspath(k) for k in keep]
+
+        def is_kept(path):
+            path = os.path.abspath(path)
+            return any(path == k or k.startswith(path + os.sep) for k in keep)
+
+        entries = []
+        seen = set()
+        for parent in (self.uploads_dir, self.results_dir, self.bundles_dir, self.scratch_dir):
+            for name in os.listdir(parent):
+                path = os.path.join(parent, name)
+                entries.append((os.path.getmtime(path), _entry_size(path, seen), path))
+        cutoff = time.time() - GC_MIN_AGE_SECONDS
+
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes or mtime > cutoff:
+                break  # sorted oldest first, so everything after is recent too
+            if is_kept(path):
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+            total -= size
+            freed += size
+        return freed
@@ -1,5 +1,12 @@
 import os
+import json
+import shutil
+import hashlib
+import argparse
+import itertools
 import mimetypes
+import multiprocessing
+from queue import Full
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 import requests
@@ -8,9 +15,8 @@ from urllib3.util.retry import Retry
 
 from langchain_community.document_loaders import WebBaseLoader, PyPDFLoader
 from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings, FakeEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.docstore.document import Document as LC_Document
 
 from docx import Document as DocxDocument
 from PyPDF2 import PdfReader
@@ -153,8 +159,292 @@ def extract_text_from_docx(path):
     doc = DocxDocument(path)
     return "\n".join([p.text for p in doc.paragraphs if p.text.strip()])
 
+# ---------------- STREAMING PIPELINE ----------------
+EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 100
+EMBED_BATCH_SIZE = 64     # chunks embedded and added to the index at a time
+CHECKPOINT_EVERY = 50     # minimum batches between checkpoints
+CHECKPOINT_GROWTH = 1.5   # each checkpoint waits until the index is this much bigger than at the last one
+PROGRESS_FILE = "progress.json"
+
+def iter_source_texts(webpage_dir=WEBPAGE_DIR, template_dir=TEMPLATE_DIR):
+    """Yield (source, text) one webpage / docx / PDF page at a time, in a stable order."""
+    for fname in sorted(os.listdir(webpage_dir)):
+        with open(os.path.join(webpage_dir, fname), "r", encoding="utf-8") as f:
+            yield fname, f.read()
+
+    for fname in sorted(os.listdir(template_dir)):
+        path = os.path.join(template_dir, fname)
+        if fname.lower().endswith(".docx"):
+            yield fname, extract_text_from_docx(path)
+        elif fname.lower().endswith(".pdf"):
+            for doc in PyPDFLoader(path).lazy_load():
+                yield fname, doc.page_content
+
+def iter_chunks(sources, chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Split each source as it arrives. Yields (id, text, metadata) with ids stable across runs."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    seq = 0
+    for source, text in sources:
+        for chunk in splitter.split_text(text):
+            yield f"chunk-{seq:08d}", chunk, {"source": source}
+            seq += 1
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _add_batch(vectorstore, batch, embeddings):
+    """Embed one batch of (id, text, metadata) chunks and add it to the index (created on first batch)."""
+    ids = [c[0] for c in batch]
+    texts = [c[1] for c in batch]
+    metadatas = [c[2] for c in batch]
+    vectors = embeddings.embed_documents(texts)
+
+    if vectorstore is None:
+        return FAISS.from_embeddings(list(zip(texts, vectors)), embeddings, metadatas=metadatas, ids=ids)
+    vectorstore.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+    return vectorstore
+
+def corpus_fingerprint(webpage_dir=WEBPAGE_DIR, template_dir=TEMPLATE_DIR, model_name=EMBED_MODEL,
+                       chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Hash of source names/sizes/mtimes, chunking params and model - a checkpoint is only valid for the same value."""
+    h = hashlib.sha256(f"{model_name}|{chunk_size}|{chunk_overlap}".encode("utf-8"))
+    for source_dir in (webpage_dir, template_dir):
+        for fname in sorted(os.listdir(source_dir)):
+            st = os.stat(os.path.join(source_dir, fname))
+            h.update(f"|{source_dir}/{fname}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    return h.hexdigest()
+
+def _save_checkpoint(vectorstore, checkpoint_dir, done, fingerprint):
+    """
+    Write the checkpoint to a sibling temp dir, then swap it in, so a crash mid-save never
+    leaves an index, docstore and progress.json that disagree with each other.
+    """
+    tmp_dir, old_dir = checkpoint_dir + ".tmp", checkpoint_dir + ".old"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    vectorstore.save_local(tmp_dir)
+    # progress.json last: a dir without it is never loaded
+    with open(os.path.join(tmp_dir, PROGRESS_FILE), "w", encoding="utf-8") as f:
+        json.dump({"chunks_done": done, "fingerprint": fingerprint}, f)
+
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(checkpoint_dir):
+        os.replace(checkpoint_dir, old_dir)
+    os.replace(tmp_dir, checkpoint_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+def _discard_checkpoint(checkpoint_dir):
+    for d in (checkpoint_dir, checkpoint_dir + ".tmp", checkpoint_dir + ".old"):
+        shutil.rmtree(d, ignore_errors=True)
+
+def _load_checkpoint(checkpoint_dir, embeddings, fingerprint):
+    # A crash between the two renames in _save_checkpoint leaves only the previous checkpoint in .old
+    for candidate in (checkpoint_dir, checkpoint_dir + ".old"):
+        progress_path = os.path.join(candidate, PROGRESS_FILE)
+        if os.path.exists(progress_path):
+            break
+    else:
+        return None, 0
+
+    with open(progress_path, "r", encoding="utf-8") as f:
+        progress = json.load(f)
+    if fingerprint is None or progress.get("fingerprint") != fingerprint:
+        print("[!] Checkpoint was made for a different corpus or settings - starting over")
+        _discard_checkpoint(checkpoint_dir)
+        return None, 0
+    vectorstore = FAISS.load_local(candidate, embeddings, allow_dangerous_deserialization=True)
+    return vectorstore, progress["chunks_done"]
+
+def build_vectorstore(chunks, embeddings, out_dir=VECTORSTORE_DIR, batch_size=EMBED_BATCH_SIZE,
+                      checkpoint_every=CHECKPOINT_EVERY, resume=True, fingerprint=None):
+    """
+    Embed a stream of (id, text, metadata) chunks in fixed-size batches and add them to FAISS incrementally.
+    - Only one batch of chunks / vectors is held at a time. The FAISS index and its in-memory docstore
+      (every chunk's text) are the output and do grow with the corpus, ~2 KB per chunk with MiniLM
+    - The index is checkpointed to `<out_dir>.partial` at least `checkpoint_every` batches apart, and only
+      once it has grown CHECKPOINT_GROWTH times since the last checkpoint. Each save rewrites the whole
+      index, so fixed spacing would cost O(N^2) I/O; geometric spacing keeps the total O(N) at the price
+      of losing up to ~1/3 of the work on a crash
+    - With resume=True an interrupted build continues from the last checkpoint, but only if it was
+      made with the same `fingerprint` (see corpus_fingerprint); otherwise it is discarded
+    Returns the number of chunks in the index.
+    """
+    checkpoint_dir = os.path.normpath(out_dir) + ".partial"
+    if resume:
+        vectorstore, done = _load_checkpoint(checkpoint_dir, embeddings, fingerprint)
+    else:
+        _discard_checkpoint(checkpoint_dir)
+        vectorstore, done = None, 0
+    if done:
+        print(f"[=] Resuming from checkpoint: {done} chunks already embedded")
+        chunks = itertools.islice(chunks, done, None)
+
+    last_checkpoint = done
+    for batch in batched(chunks, batch_size):
+        vectorstore = _add_batch(vectorstore, batch, embeddings)
+        done += len(batch)
+
+        if (checkpoint_every and done - last_checkpoint >= checkpoint_every * batch_size
+                and done >= last_checkpoint * CHECKPOINT_GROWTH):
+            last_checkpoint = done
+            _save_checkpoint(vectorstore, checkpoint_dir, done, fingerprint)
+            print(f"[+] Checkpoint: {done} chunks")
+
+    if vectorstore is None:
+        print("[!] No chunks to index")
+        return 0
+
+    vectorstore.save_local(out_dir)
+    _discard_checkpoint(checkpoint_dir)
+    return done
+
+# ---------------- SHARDED BUILD ----------------
+SHARD_QUEUE_DEPTH = 4     # batches buffered per worker before the producer blocks
+SHARD_DONE_FILE = "shard.json"
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+def _read_shard_marker(shard_dir):
+    path = os.path.join(shard_dir, SHARD_DONE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("fingerprint")
+
+def _iter_queue(queue):
+    """Flatten the batches a worker receives back into a chunk stream, until the None sentinel."""
+    while True:
+        batch = queue.get()
+        if batch is None:
+            return
+        yield from batch
+
+def _shard_worker(queue, shard_dir, model_name, threads, batch_size, checkpoint_every, resume, fingerprint):
+    """
+    Worker process: own model instance and thread budget, builds its partial index in shard_dir.
+    Runs the same checkpointed build_vectorstore as single-process mode, so an interrupted shard
+    resumes from `<shard_dir>.partial`; a shard that already finished just drains its queue.
+    """
+    if resume and fingerprint is not None and _read_shard_marker(shard_dir) == fingerprint:
+        for _ in _iter_queue(queue):
+            pass
+        return
+    shutil.rmtree(shard_dir, ignore_errors=True)  # finished shard from a different corpus / settings
+
+    # BLAS/OpenMP pools were already sized from the env vars the parent set before spawning us
+    embeddings = HuggingFaceEmbeddings(model_name=model_name)
+    import torch
+    torch.set_num_threads(threads)
+
+    total = build_vectorstore(_iter_queue(queue), embeddings, shard_dir, batch_size=batch_size,
+                              checkpoint_every=checkpoint_every, resume=resume, fingerprint=fingerprint)
+    if total and fingerprint is not None:
+        with open(os.path.join(shard_dir, SHARD_DONE_FILE), "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "chunks": total}, f)
+
+def _put(queue, proc, item):
+    """Blocking put that gives up if the worker on the other end has died (instead of hanging)."""
+    while True:
+        try:
+            queue.put(item, timeout=5)
+            return
+        except Full:
+            if not proc.is_alive():
+                raise RuntimeError(f"Embedding worker {proc.name} exited with code {proc.exitcode}")
+
+def merge_shards(shard_dirs, out_dir=VECTORSTORE_DIR):
+    """Merge partial indexes into one FAISS index. Chunk ids and metadata are kept as-is."""
+    # Nothing is embedded here, and save_local doesn't persist the embedding function, so a
+    # lightweight placeholder stands in for the model that load_local requires
+    placeholder = FakeEmbeddings(size=1)
+    merged = None
+    for shard_dir in shard_dirs:
+        if not os.path.exists(os.path.join(shard_dir, "index.faiss")):
+            continue  # worker received no batches
+        shard = FAISS.load_local(shard_dir, placeholder, allow_dangerous_deserialization=True)
+        if merged is None:
+            merged = shard
+        else:
+            merged.merge_from(shard)
+
+    if merged is None:
+        print("[!] No chunks to index")
+        return 0
+    merged.save_local(out_dir)
+    return merged.index.ntotal
+
+def build_vectorstore_sharded(chunks, workers, out_dir=VECTORSTORE_DIR, batch_size=EMBED_BATCH_SIZE,
+                              model_name=EMBED_MODEL, threads_per_worker=None,
+                              checkpoint_every=CHECKPOINT_EVERY, resume=True, fingerprint=None):
+    """
+    Embed a stream of (id, text, metadata) chunks across `workers` processes and merge the result.
+    - Batches are dealt round-robin, so the same corpus always produces the same shards
+    - Each worker loads its own model with cpu_count // workers threads (override with threads_per_worker)
+    - Partial indexes are written to `<out_dir>.shards/shard-<i>` and merged into out_dir
+    - Each shard is checkpointed like build_vectorstore; with resume=True and the same `fingerprint`
+      (see corpus_fingerprint) and worker count, an interrupted build picks up where each shard stopped
+    Returns the number of chunks in the index.
+    """
+    threads = threads_per_worker or max(1, (os.cpu_count() or 1) // workers)
+    shard_root = os.path.normpath(out_dir) + ".shards"
+    os.makedirs(shard_root, exist_ok=True)
+    shard_dirs = [os.path.join(shard_root, f"shard-{i}") for i in range(workers)]
+    if fingerprint is not None:
+        # Which chunks land in which shard depends on the worker count and batch size too
+        fingerprint = hashlib.sha256(f"{fingerprint}|{workers}|{batch_size}".encode("utf-8")).hexdigest()
+
+    # spawn: torch is not fork-safe once its thread pools have started
+    ctx = multiprocessing.get_context("spawn")
+    queues = [ctx.Queue(maxsize=SHARD_QUEUE_DEPTH) for _ in range(workers)]
+    procs = [
+        ctx.Process(target=_shard_worker, args=(queues[i], shard_dirs[i], model_name, threads,
+                                                batch_size, checkpoint_every, resume, fingerprint))
+        for i in range(workers)
+    ]
+    # Spawned children inherit os.environ at start(), and numpy/torch size their BLAS/OpenMP pools
+    # when first imported (unpickling the worker target already imports numpy), so set them here
+    saved_env = {var: os.environ.get(var) for var in THREAD_ENV_VARS}
+    os.environ.update({var: str(threads) for var in THREAD_ENV_VARS})
+    try:
+        for proc in procs:
+            proc.start()
+    finally:
+        for var, value in saved_env.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+    try:
+        for n, batch in enumerate(batched(chunks, batch_size)):
+            _put(queues[n % workers], procs[n % workers], batch)
+        for queue, proc in zip(queues, procs):
+            _put(queue, proc, None)
+        for proc in procs:
+            proc.join()
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+
+    failed = {i: proc.exitcode for i, proc in enumerate(procs) if proc.exitcode != 0}
+    if failed:
+        # A negative exit code is the signal that killed the worker (-9 is usually the OOM killer)
+        raise RuntimeError(f"Embedding worker exit codes {failed}; shard checkpoints kept in {shard_root}")
+
+    total = merge_shards(shard_dirs, out_dir)
+    shutil.rmtree(shard_root, ignore_errors=True)
+    return total
+
 # ---------------- INGESTION ----------------
-def ingest_all():
+def ingest_all(workers=1):
     ensure_dirs()
     links = extract_links_from_pdf(DATA_SOURCES_PDF)
     print(f"[+] Found {len(links)} links in Data Sources.pdf")
@@ -166,36 +456,21 @@ def ingest_all():
         else:
             scrape_webpage(link)
 
-    # Gather all text content
-    texts = []
-
-    # From webpages
-    for fname in os.listdir(WEBPAGE_DIR):
-        with open(os.path.join(WEBPAGE_DIR, fname), "r", encoding="utf-8") as f:
-            texts.append(f.read())
-
-    # From templates
-    for fname in os.listdir(TEMPLATE_DIR):
-        path = os.path.join(TEMPLATE_DIR, fname)
-        if fname.lower().endswith(".docx"):
-            texts.append(extract_text_from_docx(path))
-        elif fname.lower().endswith(".pdf"):
-            loader = PyPDFLoader(path)
-            for doc in loader.load():
-                texts.append(doc.page_content)
-
-    # Chunk and embed
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=100)
-    chunks = []
-    for text in texts:
-        chunks.extend(splitter.split_text(text))
-
-    print(f"[+] Total chunks: {len(chunks)}")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    docs = [LC_Document(page_content=c, metadata={}) for c in chunks]
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    vectorstore.save_local(VECTORSTORE_DIR)
+    # Stream sources -> chunks -> embedding batches -> FAISS, so memory stays flat as the corpus grows
+    chunks = iter_chunks(iter_source_texts(WEBPAGE_DIR, TEMPLATE_DIR))
+    fingerprint = corpus_fingerprint(WEBPAGE_DIR, TEMPLATE_DIR)
+    if workers > 1:
+        total = build_vectorstore_sharded(chunks, workers, VECTORSTORE_DIR, fingerprint=fingerprint)
+    else:
+        embeddings = HuggingFaceEmbeddings(model_name=EMBED_MODEL)
+        total = build_vectorstore(chunks, embeddings, VECTORSTORE_DIR, fingerprint=fingerprint)
+    print(f"[+] Total chunks: {total}")
     print(f"[+] Saved FAISS index to {VECTORSTORE_DIR}")
 
 if __name__ == "__main__":
-    ingest_all()
+    parser = argparse.ArgumentParser(description="Scrape ADGM sources and build the FAISS vectorstore.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="embedding processes; >1 builds sharded partial indexes and merges them "
+                             "(rerun with the same --workers to resume an interrupted build)")
+    args = parser.parse_args()
+    ingest_all(workers=args.workers)
@@ -1,5 +1,5 @@
 import os
-from typing import List, Tuple
+from typing import Callable, Iterator, List, Optional, Tuple
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
@@ -13,10 +13,16 @@ from docx.shared import Pt
 from docx.enum.text import WD_COLOR_INDEX
 import re
 
+from backend.stream_parser import IssueStreamParser
+from backend.artifact_store import ArtifactStore, hash_file
+
 load_dotenv()
 
 VECTORSTORE_PATH = os.path.join("data", "vectorstore")
 
+# Bump whenever the prompt, model or vectorstore changes so cached review results are not reused
+PIPELINE_VERSION = "gemini-2.0-flash-v1"
+
 # ----------------- Load FAISS -----------------
 def load_faiss_vectorstore():
     embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
@@ -196,7 +202,8 @@ def highlight_and_comment_docx(input_path: str, output_path: str, issues: list):
 
 
 # ----------------- Gemini Call -----------------
-def call_gemini_combined(user_docs: str, references: str) -> str:
+def stream_gemini_combined(user_docs: str, references: str) -> Iterator[str]:
+    """Yield Gemini's response text chunk by chunk as it is generated."""
     client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
     model = "gemini-2.0-flash"
 
@@ -281,15 +288,30 @@ def call_gemini_combined(user_docs: str, references: str) -> str:
     contents = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
     # print(references)
 
-    response_text = ""
     for chunk in client.models.generate_content_stream(model=model, contents=contents):
         if chunk.text:
-            response_text += chunk.text
-    return response_text.strip()
+            yield chunk.text
 
 # ----------------- Main Review -----------------
-def review_documents(filepaths: List[str]) -> dict:
-    vectorstore = load_faiss_vectorstore()
+def review_documents(
+    filepaths: List[str],
+    on_issue: Optional[Callable[[dict], None]] = None,
+    store: Optional[ArtifactStore] = None,
+    filenames: Optional[List[str]] = None,
+    digests: Optional[List[str]] = None,
+) -> dict:
+    """
+    Review the uploaded documents against the reference vectorstore.
+    - on_issue (optional) is called with each issue as soon as Gemini finishes emitting it,
+      so the UI can render issues progressively instead of waiting for the full response
+    - store (optional) caches issues per (file hash, PIPELINE_VERSION); cached documents skip
+      retrieval and Gemini entirely
+    - filenames (optional) are the original names of filepaths, used in the prompt and cache key
+      (content-addressed uploads don't keep them on disk); defaults to each path's basename
+    - digests (optional) are the content hashes the caller already has from ArtifactStore.put_upload;
+      otherwise each file is hashed here
+    """
+    vectorstore = None  # loaded lazily, only if some document is not cached
 
     # List of all required docs for Company Incorporation
     required_docs = [
@@ -312,17 +334,33 @@ def review_documents(filepaths: List[str]) -> dict:
     all_issues["required_documents"] = len(required_docs)
 
 
-    for path in filepaths:
+    for i, path in enumerate(filepaths):
         ext = os.path.splitext(path)[1].lower()
+        if ext not in (".docx", ".pdf"):
+            continue
+
+        fname = filenames[i] if filenames else os.path.basename(path)
+        uploaded_doc_names.append(fname)
+
+        # ---- Reuse cached issues for identical content, before any parsing ----
+        digest = None
+        if store:
+            digest = digests[i] if digests else hash_file(path)
+            cached = store.get_result(digest, PIPELINE_VERSION, fname)
+            if cached is not None:
+                all_issues["issues_found"].extend(cached)
+                if on_issue:
+                    for issue in cached:
+                        on_issue(issue)
+                continue
+
         if ext == ".docx":
             text = extract_text_from_docx(path)
-        elif ext == ".pdf":
-            text = extract_text_from_pdf(path)
         else:
-            continue
+            text = extract_text_from_pdf(path)
 
-        fname = os.path.basename(path)
-        uploaded_doc_names.append(fname)
+        if vectorstore is None:
+            vectorstore = load_faiss_vectorstore()
 
         gemini_text = f"\n### Document: {fname}\n{text}\n"
 
@@ -334,26 +372,27 @@ def review_documents(filepaths: List[str]) -> dict:
             ref_texts.extend([doc.page_content for doc in docs])
         references_combined = "\n---\n".join(list(set(ref_texts)))
 
-        # ---- Call Gemini for THIS document ----
-        issues_json = call_gemini_combined(gemini_text, references_combined)
-
-        # ---- Clean and parse Gemini output ----
-        import re
+        # ---- Call Gemini for THIS document, parsing issues as they stream in ----
+        # Fences and trailing junk are skipped; a truncated or malformed response
+        # still keeps every issue that closed before the break.
+        parser = IssueStreamParser()
+        doc_issues = []
         try:
-            cleaned = issues_json.strip()
-
-            # If wrapped in ```json ... ``` or ``` ... ```
-            if cleaned.startswith("```"):
-                cleaned = re.sub(r"^```[a-zA-Z]*\n?", "", cleaned)
-                cleaned = re.sub(r"\n?```$", "", cleaned)
-
-            parsed = json.loads(cleaned.strip())
-        except json.JSONDecodeError:
-            parsed = {"error": "Invalid JSON response from Gemini.", "raw_output": issues_json}
-
-        # ---- Merge issues into all_issues ----
-        if isinstance(parsed, dict) and "issues_found" in parsed:
-            all_issues["issues_found"].extend(parsed["issues_found"])
+            for text_chunk in stream_gemini_combined(gemini_text, references_combined):
+                for issue in parser.feed(text_chunk):
+                    doc_issues.append(issue)
+                    if on_issue:
+                        on_issue(issue)
+        except Exception as e:
+            # Connection reset, server error, safety block... keep what arrived, parser.done stays False
+            print(f"[!] Gemini stream failed for {fname}: {e}")
+        all_issues["issues_found"].extend(doc_issues)
+
+        # Truncated stream or unparseable items: report it, and don't cache so it is retried next time
+        if not parser.done or parser.skipped:
+            all_issues.setdefault("incomplete", []).append(fname)
+        elif store:
+            store.put_result(digest, PIPELINE_VERSION, fname, doc_issues)
 
 
     # ---- Update uploaded docs ----
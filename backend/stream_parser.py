@@ -0,0 +1,88 @@
+import json
+import re
+from typing import List
+
+# Matches the opening of the issues array, e.g. `"issues_found": [`
+ISSUES_KEY_RE = re.compile(r'"issues_found"\s*:\s*\[')
+
+
+class IssueStreamParser:
+    """
+    Incremental parser for Gemini's `{"issues_found": [...]}` response.
+    - Feed raw text chunks as they arrive from the stream
+    - Every object in the `issues_found` array is returned as soon as its closing brace arrives
+    - Code fences, text before the key and junk after the array are ignored
+    - If the stream is truncated, the issues that already closed are kept
+    """
+
+    def __init__(self):
+        self.done = False        # True once the closing `]` of issues_found has been seen
+        self._seeking = True     # still looking for `"issues_found": [`
+        self._pending = ""       # text buffered while seeking the key
+        self._depth = 0          # nesting depth inside the array (0 = between items)
+        self._in_string = False
+        self._escape = False
+        self._obj = None         # characters of the object currently being read
+        self.skipped = 0         # array items that closed but could not be parsed
+
+    def feed(self, text: str) -> List[dict]:
+        """Consume a chunk of text and return any issues completed by it."""
+        if not text or self.done:
+            return []
+
+        if self._seeking:
+            self._pending += text
+            match = ISSUES_KEY_RE.search(self._pending)
+            if not match:
+                return []
+            self._seeking = False
+            text = self._pending[match.end():]
+            self._pending = ""
+
+        issues = []
+        for ch in text:
+            if self._obj is not None:
+                self._obj.append(ch)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                continue
+
+            if ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                if self._depth == 0 and ch == "{":
+                    self._obj = [ch]
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 0:
+                    # `]` closing issues_found itself - everything after is trailing junk
+                    self.done = True
+                    break
+                self._depth -= 1
+                if self._depth == 0:
+                    issue = self._parse_object(self._obj)
+                    if issue is not None:
+                        issues.append(issue)
+                    self._obj = None
+        return issues
+
+    def _parse_object(self, chars):
+        if chars is None:
+            # Non-object item (e.g. a nested list) - not an issue
+            self.skipped += 1
+            return None
+        try:
+            parsed = json.loads("".join(chars))
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return None
+        if not isinstance(parsed, dict):
+            self.skipped += 1
+            return None
+        return parsed
@@ -0,0 +1,120 @@
+"""
+Peak-memory benchmark for the streaming ingestion pipeline.
+
+Builds a synthetic corpus by replicating data/raw/webpages 1x and 10x, then indexes each corpus
+in a fresh process and reports peak RSS, for both the streaming pipeline and the old
+"gather everything, then FAISS.from_documents" approach. Run from the repo root:
+
+    python benchmarks/ingestion_memory.py             # real MiniLM embeddings
+    python benchmarks/ingestion_memory.py --fake      # FakeEmbeddings, isolates pipeline memory
+    python benchmarks/ingestion_memory.py --model /path/to/local/model   # offline, any sentence-transformers dir
+
+Peak RSS is reported relative to the process baseline after the embedding model is loaded, next to
+the size of the saved index (index.faiss + index.pkl). The FAISS index and its in-memory docstore
+are the output and grow with the corpus; everything else in the streaming pipeline is bounded by
+EMBED_BATCH_SIZE, so streaming growth should track the index size while legacy grows much faster.
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+SCALES = [1, 10]
+MODES = ["streaming", "legacy"]
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def make_corpus(root, scale):
+    """Replicate the scraped webpages `scale` times into <root>/webpages (no templates)."""
+    from backend.doc_ingestion import WEBPAGE_DIR
+    webpage_dir = os.path.join(root, "webpages")
+    template_dir = os.path.join(root, "templates")
+    os.makedirs(webpage_dir, exist_ok=True)
+    os.makedirs(template_dir, exist_ok=True)
+    for i in range(scale):
+        for fname in os.listdir(WEBPAGE_DIR):
+            shutil.copy(os.path.join(WEBPAGE_DIR, fname), os.path.join(webpage_dir, f"{i:03d}-{fname}"))
+    return webpage_dir, template_dir
+
+
+def run_child(corpus_dir, mode, fake, model_name):
+    """Index one corpus in this process and print the measurements as JSON."""
+    from langchain_community.vectorstores import FAISS
+    from langchain_community.embeddings import HuggingFaceEmbeddings, FakeEmbeddings
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain.docstore.document import Document as LC_Document
+    from backend import doc_ingestion as ingestion
+
+    if fake:
+        embeddings = FakeEmbeddings(size=384)
+    else:
+        embeddings = HuggingFaceEmbeddings(model_name=model_name)
+        embeddings.embed_documents(["warm up"])
+    baseline = peak_rss_mb()
+
+    webpage_dir = os.path.join(corpus_dir, "webpages")
+    template_dir = os.path.join(corpus_dir, "templates")
+    out_dir = os.path.join(corpus_dir, f"vectorstore-{mode}")
+
+    if mode == "streaming":
+        chunks = ingestion.iter_chunks(ingestion.iter_source_texts(webpage_dir, template_dir))
+        total = ingestion.build_vectorstore(chunks, embeddings, out_dir, resume=False)
+    else:
+        texts = [text for _, text in ingestion.iter_source_texts(webpage_dir, template_dir)]
+        splitter = RecursiveCharacterTextSplitter(chunk_size=ingestion.CHUNK_SIZE, chunk_overlap=ingestion.CHUNK_OVERLAP)
+        chunks = []
+        for text in texts:
+            chunks.extend(splitter.split_text(text))
+        docs = [LC_Document(page_content=c, metadata={}) for c in chunks]
+        FAISS.from_documents(docs, embeddings).save_local(out_dir)
+        total = len(docs)
+
+    index_mb = sum(os.path.getsize(os.path.join(out_dir, f)) for f in os.listdir(out_dir)) / (1024 * 1024)
+    print(json.dumps({"chunks": total, "baseline_mb": baseline, "peak_mb": peak_rss_mb(), "index_mb": index_mb}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fake", action="store_true", help="use FakeEmbeddings instead of MiniLM")
+    parser.add_argument("--model", default=None, help="embedding model name or local path (default: EMBED_MODEL)")
+    parser.add_argument("--child", nargs=2, metavar=("CORPUS_DIR", "MODE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        from backend.doc_ingestion import EMBED_MODEL
+        run_child(args.child[0], args.child[1], args.fake, args.model or EMBED_MODEL)
+        return
+
+    work = tempfile.mkdtemp(prefix="ingest-bench-")
+    try:
+        print(f"{'scale':>5} {'mode':>10} {'chunks':>8} {'peak MB':>9} {'over baseline MB':>17} {'index MB':>9}")
+        for scale in SCALES:
+            corpus_dir = os.path.join(work, f"x{scale}")
+            make_corpus(corpus_dir, scale)
+            for mode in MODES:
+                cmd = [sys.executable, os.path.abspath(__file__), "--child", corpus_dir, mode]
+                if args.fake:
+                    cmd.append("--fake")
+                if args.model:
+                    cmd += ["--model", args.model]
+                out = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+                stats = json.loads(out.strip().splitlines()[-1])
+                print(f"{scale:>4}x {mode:>10} {stats['chunks']:>8} {stats['peak_mb']:>9.1f} "
+                      f"{stats['peak_mb'] - stats['baseline_mb']:>17.1f} {stats['index_mb']:>9.1f}")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
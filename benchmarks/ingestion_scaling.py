@@ -0,0 +1,66 @@
+"""
+Scaling benchmark for the sharded embedding / index build.
+
+Builds a synthetic corpus (data/raw/webpages replicated --scale times) and indexes it with
+1, 2, 4 and 8 worker processes, reporting wall time, throughput and speedup over the smallest
+worker count run (1 by default; the column header names it). Run from the repo root:
+
+    python benchmarks/ingestion_scaling.py
+    python benchmarks/ingestion_scaling.py --scale 10 --workers 1 2 4
+    python benchmarks/ingestion_scaling.py --model /path/to/local/model   # offline
+
+Each worker gets cpu_count // workers threads, so every run uses the same total core budget.
+Times include model loading in every worker and the final merge (which loads no model).
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from ingestion_memory import make_corpus
+
+
+def main():
+    from backend import doc_ingestion as ingestion
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=4, help="times to replicate the scraped webpages")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--model", default=ingestion.EMBED_MODEL, help="embedding model name or local path")
+    args = parser.parse_args()
+    worker_counts = sorted(set(args.workers))
+    reference = worker_counts[0]
+
+    work = tempfile.mkdtemp(prefix="ingest-scaling-")
+    try:
+        webpage_dir, template_dir = make_corpus(os.path.join(work, "corpus"), args.scale)
+        print(f"cpus={os.cpu_count()} scale={args.scale}x batch_size={ingestion.EMBED_BATCH_SIZE}")
+        speedup = f"vs {reference}w"
+        print(f"{'workers':>7} {'threads/worker':>14} {'chunks':>7} {'seconds':>8} {'chunks/s':>9} {speedup:>8}")
+
+        base = None
+        for workers in worker_counts:
+            out_dir = os.path.join(work, f"vectorstore-{workers}")
+            chunks = ingestion.iter_chunks(ingestion.iter_source_texts(webpage_dir, template_dir))
+            start = time.perf_counter()
+            try:
+                total = ingestion.build_vectorstore_sharded(chunks, workers, out_dir, model_name=args.model, resume=False)
+            except RuntimeError as e:
+                # e.g. workers OOM-killed: each holds its own model, so memory scales with the worker count
+                print(f"{workers:>7} failed: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            if workers == reference:
+                base = elapsed
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            print(f"{workers:>7} {threads:>14} {total:>7} {elapsed:>8.1f} {total / elapsed:>9.1f} {base / elapsed:>7.2f}x")
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,16 @@
 import streamlit as st
 import os
 import sys
-import shutil
 from pathlib import Path
-import io
-import zipfile
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from backend.rag_pipeline_2 import review_documents, highlight_and_comment_docx
+from backend.rag_pipeline_2 import review_documents, highlight_and_comment_docx, PIPELINE_VERSION
+from backend.artifact_store import ArtifactStore
 
 st.set_page_config(page_title="Corporate Agent", layout="wide")
 
-# Temporary storage for reviewed files (still using static dir for now)
-STATIC_DIR = Path("static")
-STATIC_DIR.mkdir(exist_ok=True)
+# Content-addressed storage for uploads, cached results and ZIP bundles
+store = ArtifactStore()
 
 st.title("📄 Corporate Agent")
 st.markdown("Upload your **.docx** or **.pdf** files for automated compliance review.")
@@ -23,6 +20,8 @@ if "result" not in st.session_state:
     st.session_state.result = None
 if "reviewed_files" not in st.session_state:
     st.session_state.reviewed_files = []
+if "bundle_path" not in st.session_state:
+    st.session_state.bundle_path = None
 
 uploaded_files = st.file_uploader(
     "Upload Documents",
@@ -34,30 +33,47 @@ if st.button("Review Documents"):
     if not uploaded_files:
         st.warning("Please upload at least one document.")
     else:
-        filepaths = []
-        os.makedirs("data/raw/uploaded", exist_ok=True)
-
-        for uploaded_file in uploaded_files:
-            temp_path = os.path.join("data", "raw", "uploaded", uploaded_file.name)
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            filepaths.append(temp_path)
+        # Stored by content hash: same filename from different users never collides,
+        # identical files are only written once. The original name is kept alongside.
+        uploads = [(*store.put_upload(f.getvalue(), f.name), f.name) for f in uploaded_files]
+        filepaths = [path for _, path, _ in uploads]
+        filenames = [name for _, _, name in uploads]
+        digests = [digest for digest, _, _ in uploads]
 
         status = st.empty()
         status.info("🔍 Reviewing documents...")
 
-        result = review_documents(filepaths)
+        # Show issues as soon as Gemini emits them, before the full report is ready
+        live_box = st.empty()
+        live_issues = live_box.container()
+
+        def show_issue(issue):
+            live_issues.markdown(
+                f"**{issue.get('severity', 'N/A')}** · {issue.get('document', 'N/A')} · "
+                f"{issue.get('section', 'N/A')}: {issue.get('issue', '')}"
+            )
+
+        result = review_documents(filepaths, on_issue=show_issue, store=store, filenames=filenames, digests=digests)
+        live_box.empty()  # the Issue Report below takes over
         status.info("✅ Issues identified, editing documents...")
 
         reviewed_files = []
         if isinstance(result, dict) and result.get("issues_found"):
-            for filepath in filepaths:
+            for digest, filepath, filename in uploads:
+                # Reviewed output is cached alongside the issues for this (hash, pipeline version, name)
+                cached_path = store.get_reviewed(digest, PIPELINE_VERSION, filename)
+                if cached_path:
+                    reviewed_files.append(cached_path)
+                    continue
+
+                # Written privately first, then published to the cache if the result is complete
+                reviewed_path = store.scratch_path(filename)
                 if filepath.lower().endswith(".docx"):
-                    reviewed_path = os.path.join(
-                        "data", "raw", "uploaded", f"reviewed_{os.path.basename(filepath)}"
-                    )
+                    doc_issues = store.get_result(digest, PIPELINE_VERSION, filename)
+                    if doc_issues is None:
+                        doc_issues = result["issues_found"]
 
-                    filename_no_ext = Path(filepath).stem.lower()
+                    filename_no_ext = Path(filename).stem.lower()
                     # file_issues = [
                     #     i for i in result["issues_found"]
                     #     if filename_no_ext in i.get("document", "").replace(" ", "_").lower()
@@ -71,7 +87,7 @@ if st.button("Review Documents"):
                     # ]
 
                     file_issues = [
-                        i for i in result["issues_found"]
+                        i for i in doc_issues
                         if i.get("document", "").lower().replace(" ", "") in filename_no_ext.replace(" ", "")
                         or filename_no_ext.replace(" ", "") in i.get("document", "").lower().replace(" ", "")
                     ]
@@ -81,44 +97,45 @@ if st.button("Review Documents"):
                     highlighted = highlight_and_comment_docx(filepath, reviewed_path, file_issues)
 
                     if not highlighted:
-                        shutil.copy(filepath, reviewed_path)
-
-                    reviewed_files.append(reviewed_path)
+                        store.link(filepath, reviewed_path)
 
                 else:
-                    # PDFs - just copy them as reviewed (optional)
-                    reviewed_path = os.path.join(
-                        "data", "raw", "uploaded", f"reviewed_{os.path.basename(filepath)}"
-                    )
-                    shutil.copy(filepath, reviewed_path)
-                    reviewed_files.append(reviewed_path)
+                    # PDFs - unchanged, so hardlink instead of copying
+                    store.link(filepath, reviewed_path)
+
+                reviewed_files.append(store.save_reviewed(digest, PIPELINE_VERSION, filename, reviewed_path))
+
+        # Build the ZIP once per result set; reruns just stream it from disk
+        bundle_path = store.bundle(reviewed_files) if reviewed_files else None
+        store.gc(keep=filepaths + reviewed_files + ([bundle_path] if bundle_path else []))
 
         # Save to session state
         st.session_state.result = result
         st.session_state.reviewed_files = reviewed_files
+        st.session_state.bundle_path = bundle_path
         status.info("✅ Your documents have been processed and are ready for download.")
 
 # Step 1: One-click ZIP download for all reviewed files
-if st.session_state.reviewed_files:
+if st.session_state.bundle_path and os.path.exists(st.session_state.bundle_path):
     st.subheader("📥 Download All Edited Files")
 
-    # Create ZIP in memory
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for filepath in st.session_state.reviewed_files:
-            zipf.write(filepath, arcname=os.path.basename(filepath))
-    zip_buffer.seek(0)
-
-    st.download_button(
-        label="⬇️ Download All Reviewed Documents",
-        data=zip_buffer,
-        file_name="reviewed_documents.zip",
-        mime="application/zip"
-    )
+    with open(st.session_state.bundle_path, "rb") as zip_file:
+        st.download_button(
+            label="⬇️ Download All Reviewed Documents",
+            data=zip_file,
+            file_name="reviewed_documents.zip",
+            mime="application/zip"
+        )
 
 # Step 2: Issue Report
 if st.session_state.result and isinstance(st.session_state.result, dict):
     result = st.session_state.result
+    if result.get("incomplete"):
+        st.warning(
+            "⚠️ The review was cut short or partly unreadable for: "
+            + ", ".join(result["incomplete"])
+            + ". Only the issues received are shown - review again to retry."
+        )
     if result.get("issues_found"):
         issues = result["issues_found"]
 